@@ -1,22 +1,50 @@
 """AWS Route 53 Backup"""
 
 import csv
+import gzip
+import io
 import json
+import logging
 import os
+import shutil
+import tarfile
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 from botocore.exceptions import ClientError
 from hashlib import md5
 
+# Lambda attaches its own handler to the root logger; only the level is set here
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
 # Set environmental variables
 
+
+def get_env_flag(name):
+    """Return a 0/1 environment variable as a boolean, defaulting to False."""
+    value = os.environ.get(name, "0").strip().lower()
+    if value in ("", "0", "false"):
+        return False
+    if value in ("1", "true"):
+        return True
+    raise Exception("{} environment variable must be 0 or 1.".format(name))
+
+
 s3_bucket_name = os.environ.get("S3_BUCKET_NAME", None)
 s3_bucket_region = os.environ.get("S3_BUCKET_REGION", None)
 s3_bucket_folder = os.environ.get("S3_BUCKET_FOLDER", None)
-s3_bucket_versioned = bool(int(os.environ.get("S3_BUCKET_VERSIONED"), 0) == 1)
+s3_bucket_versioned = get_env_flag("S3_BUCKET_VERSIONED")
+max_workers = int(os.environ.get("MAX_WORKERS", 8))
+compress_backups = get_env_flag("COMPRESS_BACKUPS")
+archive_backups = get_env_flag("ARCHIVE_BACKUPS")
+resumable_backups = get_env_flag("RESUMABLE_BACKUPS")
 
 if not s3_bucket_name or not s3_bucket_region:
     raise Exception(
@@ -26,15 +54,75 @@ if not s3_bucket_name or not s3_bucket_region:
 
 # Create client objects
 
-s3 = boto3.client("s3", region_name="us-east-1")
-route53 = boto3.client("route53", config=Config(retries={"max_attempts": 10}))
+# Each zone worker uploads two files at once, and each upload sends up to this many
+# parts at once
+upload_max_concurrency = 10
+
+# One session resolves credentials once for both clients. The connection pools are
+# sized so every concurrent request of the zone workers gets a pooled connection.
+session = boto3.session.Session()
+s3 = session.client(
+    "s3",
+    region_name="us-east-1",
+    config=Config(max_pool_connections=2 * max_workers * upload_max_concurrency),
+)
+route53 = session.client(
+    "route53",
+    # Adaptive retries add client side rate limiting on top of throttle_route53
+    config=Config(
+        retries={"max_attempts": 10, "mode": "adaptive"},
+        max_pool_connections=max_workers,
+    ),
+)
+
+# Route 53 allows 5 API requests per second per account
+route53_min_interval = 1.0 / 5
+route53_lock = threading.Lock()
+route53_last_call = [0.0]
+
+# Buckets already checked or created by this container, reused on warm invocations
+verified_buckets = dict()
+
+# Save progress every this many zones, and stop starting new zones once a Lambda
+# invocation has less than this many milliseconds left
+manifest_interval = 100
+minimum_remaining_time = 60 * 1000
+
+# Row layout of the csv backups, formatted in one call for rows that need no quoting
+csv_row_format = "{},{},{},{},{},{},{},{},{}\r\n".format
+
+# Files at or above the threshold are uploaded in parts, several at a time.
+# compute_etag relies on these matching the transfer config.
+multipart_threshold = 8 * 1024 * 1024
+multipart_chunksize = 8 * 1024 * 1024
+transfer_config = TransferConfig(
+    multipart_threshold=multipart_threshold,
+    multipart_chunksize=multipart_chunksize,
+    max_concurrency=upload_max_concurrency,
+    use_threads=True,
+)
 
 
 # Functions
 
 
+def throttle_route53(**kwargs):
+    """Block until another Route 53 API call fits within the rate limit."""
+    with route53_lock:
+        wait = route53_last_call[0] + route53_min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        route53_last_call[0] = time.monotonic()
+
+
+# Clients are shared between worker threads, so throttle every Route 53 call
+route53.meta.events.register("before-call.route53", throttle_route53)
+
+
 def create_s3_bucket(bucket_name, bucket_region="us-east-1"):
     """Create an Amazon S3 bucket if it doesn't exist."""
+    if bucket_name in verified_buckets:
+        return verified_buckets[bucket_name]
     try:
         response = s3.head_bucket(Bucket=bucket_name)
         # Set versioning to a boolean; True if status returns "Enabled"
@@ -49,10 +137,11 @@ def create_s3_bucket(bucket_name, bucket_region="us-east-1"):
                     )
                 )
             )
+        verified_buckets[bucket_name] = response
         return response
     except ClientError as e:
         if e.response["Error"]["Code"] != "404":
-            print(e)
+            logger.error(e)
             return None
     # creating bucket in us-east-1 (N. Virginia) requires
     # no CreateBucketConfiguration parameter be passed
@@ -80,196 +169,406 @@ def create_s3_bucket(bucket_name, bucket_region="us-east-1"):
             s3.put_bucket_versioning(
                 Bucket=bucket_name, VersioningConfiguration={"Status": "Enabled"}
             )
+    verified_buckets[bucket_name] = response
     return response
 
 
-def upload_to_s3(filename, bucket_name, key, folder=None):
-    """Upload a file to a folder in an Amazon S3 bucket."""
+def compute_etag(fileobj):
+    """Return the ETag S3 will assign to a file object uploaded by upload_fileobj."""
+    file_hash = md5()
+    part_digests = []
+    size = 0
+    # Hash in part sized chunks so the content is never copied at once
+    for chunk in iter(lambda: fileobj.read(multipart_chunksize), b""):
+        file_hash.update(chunk)
+        part_digests.append(md5(chunk).digest())
+        size += len(chunk)
+    fileobj.seek(0)
+    if size < multipart_threshold:
+        return '"{}"'.format(file_hash.hexdigest())
+    # Multipart ETags are the MD5 of the part MD5s, suffixed with the part count
+    return '"{}-{}"'.format(md5(b"".join(part_digests)).hexdigest(), len(part_digests))
+
+
+def get_s3_etags(bucket_name, prefix=""):
+    """Return a dict of object keys to ETags under a prefix in an Amazon S3 bucket."""
+    paginator = s3.get_paginator("list_objects_v2")
+    etags = {}
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for s3_object in page.get("Contents", []):
+            etags[s3_object["Key"]] = s3_object["ETag"]
+    return etags
+
+
+def compress_file(fileobj):
+    """Return a gzip compressed copy of an in-memory file."""
+    compressed_file = io.BytesIO()
+    # A fixed mtime keeps the output, and so the ETag, stable between runs
+    with gzip.GzipFile(
+        fileobj=compressed_file, mode="wb", compresslevel=6, mtime=0
+    ) as gzip_file:
+        shutil.copyfileobj(fileobj, gzip_file)
+    compressed_file.seek(0)
+    return compressed_file
+
+
+def upload_to_s3(
+    fileobj,
+    bucket_name,
+    key,
+    folder=None,
+    etags=None,
+    extra_args=None,
+    versioned=s3_bucket_versioned,
+):
+    """Upload a file object to a folder in an Amazon S3 bucket."""
     # TODO: Change this logic so it doesn't require a folder.
     key = "/".join(filter(None, [folder, key]))
     # If the bucket is versioned, only upload if it doesn't match the existing version.
-    if s3_bucket_versioned:
-        # If the object doesn't already exist, no need to check ETag.
-        try:
-            response = s3.head_object(Bucket=bucket_name, Key=key)
-        except ClientError as e:
-            if e.response.get("Error", dict()).get("Code") == "404":
-                # 404 error means the file doesn't exist. Proceed to upload.
-                pass
-            else:
-                raise
-        else:
-            # We got a response, so we need to proceed to ETag comparison to see if the file has changed.
-            with open(filename, "rb") as f:
-                # TODO: Complete ETag computation for excessively large zones.
-                #       Direct MD5 is only for single part uploads.
-                if md5(f.read()).hexdigest().join(['"', '"']) == response["ETag"]:
-                    return
-    s3.upload_file(filename, bucket_name, key)
-
-
-def get_route53_hosted_zones(next_zone=None):
-    """Recursively returns a list of hosted zones in Amazon Route 53."""
-    if next_zone:
-        response = route53.list_hosted_zones_by_name(
-            DNSName=next_zone[0], HostedZoneId=next_zone[1]
-        )
-    else:
-        response = route53.list_hosted_zones_by_name()
+    if versioned:
+        # Callers backing up many zones pass in one listing of the bucket's ETags
+        # rather than having each upload look its object up.
+        if etags is None:
+            etags = get_s3_etags(bucket_name, key)
+        # If the object doesn't already exist, there is no ETag to compare.
+        if key in etags and compute_etag(fileobj) == etags[key]:
+            return
+    s3.upload_fileobj(
+        fileobj, bucket_name, key, ExtraArgs=extra_args, Config=transfer_config
+    )
+
+
+def load_manifest(bucket_name, key):
+    """Return the set of hosted zone ids completed by a previous invocation."""
+    try:
+        response = s3.get_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", dict()).get("Code") == "NoSuchKey":
+            return set()
+        raise
+    return set(json.loads(response["Body"].read())["completed"])
+
+
+def save_manifest(bucket_name, key, completed):
+    """Save the set of completed hosted zone ids so a later invocation can resume."""
+    s3.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=json.dumps({"completed": sorted(completed)}).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def running_out_of_time(context):
+    """Return True if a Lambda invocation is too close to its timeout to continue."""
+    # Outside of Lambda the context has no deadline
+    if not hasattr(context, "get_remaining_time_in_millis"):
+        return False
+    return context.get_remaining_time_in_millis() < minimum_remaining_time
+
+
+def get_route53_hosted_zones():
+    """Returns a list of hosted zones in Amazon Route 53."""
+    response = route53.list_hosted_zones_by_name()
     hosted_zones = response["HostedZones"]
-    # if response is truncated, call function again with next zone name/id
-    if response["IsTruncated"]:
-        hosted_zones += get_route53_hosted_zones(
-            (response["NextDNSName"], response["NextHostedZoneId"])
+    # list_hosted_zones_by_name has no paginator, so follow the next zone name/id
+    while response["IsTruncated"]:
+        response = route53.list_hosted_zones_by_name(
+            DNSName=response["NextDNSName"], HostedZoneId=response["NextHostedZoneId"]
         )
+        hosted_zones += response["HostedZones"]
     return hosted_zones
 
 
-def get_route53_zone_records(zone_id, next_record=None):
-    """Recursively returns a list of records of a hosted zone in Route 53."""
-    if next_record:
-        response = route53.list_resource_record_sets(
-            HostedZoneId=zone_id,
-            StartRecordName=next_record[0],
-            StartRecordType=next_record[1],
-        )
-    else:
-        response = route53.list_resource_record_sets(HostedZoneId=zone_id)
-    zone_records = response["ResourceRecordSets"]
-    # if response is truncated, call function again with next record name/id
-    if response["IsTruncated"]:
-        zone_records += get_route53_zone_records(
-            zone_id, (response["NextRecordName"], response["NextRecordType"])
-        )
+def get_route53_zone_records(zone_id):
+    """Returns a list of records of a hosted zone in Route 53."""
+    paginator = route53.get_paginator("list_resource_record_sets")
+    zone_records = []
+    # 300 is the maximum page size Route 53 allows for record sets
+    for page in paginator.paginate(
+        HostedZoneId=zone_id, PaginationConfig={"PageSize": 300}
+    ):
+        zone_records += page["ResourceRecordSets"]
     return zone_records
 
 
 def get_record_value(record):
     """Return a list of values for a hosted zone record."""
     # test if record's value is Alias or dict of records
-    try:
-        value = [
-            ":".join(
-                [
-                    "ALIAS",
-                    record["AliasTarget"]["HostedZoneId"],
-                    record["AliasTarget"]["DNSName"],
-                ]
-            )
+    alias_target = record.get("AliasTarget")
+    if alias_target:
+        return ["ALIAS:" + alias_target["HostedZoneId"] + ":" + alias_target["DNSName"]]
+    return [v["Value"] for v in record["ResourceRecords"]]
+
+
+def write_zone_to_csv(zone, zone_records):
+    """Write hosted zone records to an in-memory csv file."""
+    csv_file = io.BytesIO()
+    text_file = io.TextIOWrapper(csv_file, encoding="utf-8", newline="")
+    writer = csv.writer(text_file)
+    # write column headers
+    writer.writerow(
+        [
+            "NAME",
+            "TYPE",
+            "VALUE",
+            "TTL",
+            "REGION",
+            "WEIGHT",
+            "SETID",
+            "FAILOVER",
+            "EVALUATE_HEALTH",
         ]
-    except KeyError:
-        value = []
-        for v in record["ResourceRecords"]:
-            value.append(v["Value"])
-    return value
+    )
+    # flatten every record into rows; records with multiple values
+    # (e.g., MX records) get one row per value
+    rows = (
+        (
+            record["Name"],
+            record["Type"],
+            value,
+            record.get("TTL", ""),
+            record.get("Region", ""),
+            record.get("Weight", ""),
+            record.get("SetIdentifier", ""),
+            record.get("Failover", ""),
+            record.get("AliasTarget", {}).get("EvaluateTargetHealth", ""),
+        )
+        for record in zone_records
+        for value in get_record_value(record)
+    )
+    write = text_file.write
+    for row in rows:
+        line = csv_row_format(*row)
+        # Most rows need no quoting, so write them directly. A plain row has exactly
+        # its 8 separators and 1 line terminator; rows with quotes (e.g., TXT
+        # records), extra commas or line breaks go through the csv writer.
+        if (
+            '"' in line
+            or line.count(",") != 8
+            or line.count("\n") != 1
+            or line.count("\r") != 1
+        ):
+            writer.writerow(row)
+        else:
+            write(line)
+    # detach so the wrapper doesn't close the underlying buffer
+    text_file.flush()
+    text_file.detach()
+    csv_file.seek(0)
+    return csv_file
 
 
-def try_record(test, record):
-    """Return a value for a record"""
-    # test for Key and Type errors
-    try:
-        value = record[test]
-    except KeyError:
-        value = ""
-    except TypeError:
-        value = ""
-    return value
+def write_zone_to_json(zone, zone_records):
+    """Write hosted zone records to an in-memory json file."""
+    # Without indent, one-shot json.dumps runs on the stdlib's C encoder (json.dump
+    # never does); compact separators only trim the output
+    return io.BytesIO(json.dumps(zone_records, separators=(",", ":")).encode("utf-8"))
+
+
+def get_zone_files(zone):
+    """Return a hosted zone's csv and json files with their keys and content types."""
+    zone_name = zone["Name"]
+    zone_records = get_route53_zone_records(zone["Id"])
+    return [
+        (write_zone_to_csv(zone, zone_records), zone_name + "csv", "text/csv"),
+        (
+            write_zone_to_json(zone, zone_records),
+            zone_name + "json",
+            "application/json",
+        ),
+    ]
 
 
-def write_zone_to_csv(zone, zone_records):
-    """Write hosted zone records to a csv file in /tmp/."""
-    zone_file_name = "/tmp/" + zone["Name"] + "csv"
-    # write to csv file with zone name
-    with open(zone_file_name, "w", newline="") as csv_file:
-        writer = csv.writer(csv_file)
-        # write column headers
-        writer.writerow(
-            [
-                "NAME",
-                "TYPE",
-                "VALUE",
-                "TTL",
-                "REGION",
-                "WEIGHT",
-                "SETID",
-                "FAILOVER",
-                "EVALUATE_HEALTH",
-            ]
-        )
-        # loop through all the records for a given zone
-        for record in zone_records:
-            csv_row = [""] * 9
-            csv_row[0] = record["Name"]
-            csv_row[1] = record["Type"]
-            csv_row[3] = try_record("TTL", record)
-            csv_row[4] = try_record("Region", record)
-            csv_row[5] = try_record("Weight", record)
-            csv_row[6] = try_record("SetIdentifier", record)
-            csv_row[7] = try_record("Failover", record)
-            csv_row[8] = try_record(
-                "EvaluateTargetHealth", try_record("AliasTarget", record)
+def backup_zone(zone, folder_prefix, etags, versioned, upload_executor):
+    """Back up a hosted zone to its own folder in the Amazon S3 bucket."""
+    # zone names end in a "." which is left off the folder name
+    if folder_prefix:
+        zone_folder = folder_prefix + "/" + zone["Name"][:-1]
+    else:
+        zone_folder = zone["Name"][:-1]
+    # The two uploads are independent, so run them side by side on the
+    # executor shared by every zone of this run
+    uploads = []
+    for zone_file, key, content_type in get_zone_files(zone):
+        extra_args = {"ContentType": content_type}
+        if compress_backups:
+            zone_file = compress_file(zone_file)
+            key += ".gz"
+            extra_args["ContentEncoding"] = "gzip"
+        uploads.append(
+            upload_executor.submit(
+                upload_to_s3,
+                zone_file,
+                s3_bucket_name,
+                key,
+                folder=zone_folder,
+                etags=etags,
+                extra_args=extra_args,
+                versioned=versioned,
             )
-            value = get_record_value(record)
-            # if multiple values (e.g., MX records), write each as its own row
-            for v in value:
-                csv_row[2] = v
-                writer.writerow(csv_row)
-    return zone_file_name
+        )
+    for upload in uploads:
+        upload.result()
+
+
+def backup_zones_to_archive(hosted_zones, folder_prefix, etags, versioned):
+    """Back up all hosted zones as a single tar.gz archive in the Amazon S3 bucket."""
+    # Fixed mtimes keep the archive, and so the ETag, stable between runs
+    with tempfile.TemporaryFile() as archive_file:
+        with gzip.GzipFile(
+            fileobj=archive_file, mode="wb", compresslevel=6, mtime=0
+        ) as gzip_file, tarfile.open(fileobj=gzip_file, mode="w") as archive:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for zone, zone_files in zip(
+                    hosted_zones, executor.map(get_zone_files, hosted_zones)
+                ):
+                    for zone_file, key, _ in zone_files:
+                        tar_info = tarfile.TarInfo("/".join([zone["Name"][:-1], key]))
+                        tar_info.size = len(zone_file.getbuffer())
+                        archive.addfile(tar_info, zone_file)
+        archive_file.seek(0)
+        upload_to_s3(
+            archive_file,
+            s3_bucket_name,
+            "route53_backup.tar.gz",
+            folder=folder_prefix,
+            etags=etags,
+            extra_args={"ContentType": "application/gzip"},
+            versioned=versioned,
+        )
 
 
-def write_zone_to_json(zone, zone_records):
-    """Write hosted zone records to a json file in /tmp/."""
-    zone_file_name = "/tmp/" + zone["Name"] + "json"
-    # write to json file with zone name
-    with open(zone_file_name, "w") as json_file:
-        json.dump(zone_records, json_file, indent=4)
-    return zone_file_name
+def get_finished_zones(futures):
+    """Return the ids of hosted zones whose backup futures completed successfully."""
+    return set(
+        zone_id
+        for future, zone_id in futures.items()
+        if future.done() and not future.cancelled() and not future.exception()
+    )
 
 
-## HANDLER FUNCTION ##
+def backup_zones(
+    hosted_zones, folder_prefix, etags, versioned, context, completed, manifest_key
+):
+    """Back up hosted zones not yet in completed, adding each one as it finishes.
+
+    Returns False if the Lambda invocation ran out of time before every zone was
+    started and backed up.
+    """
+    pending_zones = [zone for zone in hosted_zones if zone["Id"] not in completed]
+    # Every zone's uploads share one executor, sized so each zone worker can have
+    # both of its files uploading at once
+    with ThreadPoolExecutor(max_workers=2 * max_workers) as upload_executor:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    backup_zone,
+                    zone,
+                    folder_prefix,
+                    etags,
+                    versioned,
+                    upload_executor,
+                ): zone["Id"]
+                for zone in pending_zones
+            }
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    completed.add(futures[future])
+                    if not resumable_backups:
+                        continue
+                    if len(completed) % manifest_interval == 0:
+                        save_manifest(s3_bucket_name, manifest_key, completed)
+                    # Stopping only helps while there are zones left to start
+                    if running_out_of_time(context) and any(
+                        not f.running() and not f.done() for f in futures
+                    ):
+                        # Save before waiting on the zones still running, in
+                        # case the invocation times out while they finish
+                        save_manifest(s3_bucket_name, manifest_key, completed)
+                        break
+            finally:
+                # Don't start any more zones; running ones finish on exit
+                for future in futures:
+                    future.cancel()
+    # Zones still running when the loop stopped have finished by now, and may have
+    # been the last ones left
+    completed.update(get_finished_zones(futures))
+    return all(zone["Id"] in completed for zone in hosted_zones)
 
 
-def lambda_handler(event, context):
-    def gen_folder(zone=dict()):
-        return "/".join(
-            filter(None, [s3_bucket_folder, time_stamp, zone.get("Name", list())[:-1]])
-        )
+## HANDLER FUNCTION ##
 
-    """Handler function for AWS Lambda"""
-    if not s3_bucket_versioned:
+
+def backup_hosted_zones(event, context):
+    """Back up every hosted zone to the S3 bucket."""
+    # An event carrying the marker returned by an unfinished invocation resumes it
+    resuming = isinstance(event, dict) and bool(event.get("continue"))
+    if s3_bucket_versioned:
+        time_stamp = None
+    elif resuming:
+        time_stamp = event["time_stamp"]
+    else:
         time_stamp = time.strftime(
             "%Y-%m-%dT%H:%M:%SZ", datetime.utcnow().utctimetuple()
         )
-    else:
-        time_stamp = None
+    # Folder every object of this run goes under; zone files go in a subfolder
+    folder_prefix = "/".join(filter(None, [s3_bucket_folder, time_stamp]))
     if not create_s3_bucket(s3_bucket_name, s3_bucket_region):
         return False
     # bucket_response = create_s3_bucket(s3_bucket_name, s3_bucket_region)
     # if(not bucket_response):
     # return False
     hosted_zones = get_route53_hosted_zones()
-    print(
-        "Backing up {} hosted zones to {}/{}".format(
-            len(hosted_zones), s3_bucket_name, gen_folder()
-        )
+    logger.info(
+        "Backing up %s hosted zones to %s/%s",
+        len(hosted_zones),
+        s3_bucket_name,
+        folder_prefix,
     )
-    for zone in hosted_zones:
-        zone_folder = gen_folder(zone)
-        zone_records = get_route53_zone_records(zone["Id"])
-        upload_to_s3(
-            write_zone_to_csv(zone, zone_records),
-            s3_bucket_name,
-            (zone["Name"] + "csv"),
-            folder=zone_folder,
-        )
-        upload_to_s3(
-            write_zone_to_json(zone, zone_records),
-            s3_bucket_name,
-            (zone["Name"] + "json"),
-            folder=zone_folder,
+    versioned = s3_bucket_versioned
+    # In versioned mode, fetch every existing ETag in one listing up front
+    if versioned:
+        etags = get_s3_etags(s3_bucket_name, folder_prefix)
+    else:
+        etags = None
+    if archive_backups:
+        backup_zones_to_archive(hosted_zones, folder_prefix, etags, versioned)
+        return True
+
+    # With RESUMABLE_BACKUPS, track finished zones in a manifest so that an
+    # invocation running out of time can hand the rest of the backup on to the next
+    manifest_key = "/".join(filter(None, [folder_prefix, "_manifest.json"]))
+    completed = load_manifest(s3_bucket_name, manifest_key) if resuming else set()
+    if not backup_zones(
+        hosted_zones, folder_prefix, etags, versioned, context, completed, manifest_key
+    ):
+        save_manifest(s3_bucket_name, manifest_key, completed)
+        logger.warning(
+            "Backed up only %s of %s hosted zones before running out of time; "
+            "invoke again with the returned event to continue",
+            len(completed),
+            len(hosted_zones),
         )
+        return {"continue": True, "time_stamp": time_stamp}
+    if resumable_backups:
+        # A manifest may be left from this run or an earlier unfinished one
+        s3.delete_object(Bucket=s3_bucket_name, Key=manifest_key)
     return True
 
 
+def lambda_handler(event, context):
+    """Handler function for AWS Lambda"""
+    try:
+        return backup_hosted_zones(event, context)
+    except Exception:
+        # The bucket may have been deleted or reconfigured since it was verified,
+        # so check it again on the next invocation
+        verified_buckets.pop(s3_bucket_name, None)
+        raise
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     lambda_handler(0, 0)